@@ -1,11 +1,14 @@
 # pip install flask peewee bcrypt wtforms waitress
+# bcrypt 與 wtforms 於實際使用時才載入，以縮短啟動 (import) 時間
+import gzip
+import hashlib
 import os
+import threading
 from datetime import datetime
 from functools import wraps
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, make_response
+from jinja2 import FileSystemBytecodeCache
 from peewee import *
-from bcrypt import hashpw, gensalt, checkpw
-from wtforms import Form, StringField, PasswordField, validators
 
 # --- 1. 資料庫與模型配置 ---
 DB_PATH = 'database.db'
@@ -25,6 +28,7 @@ class User(BaseModel):
         # 由於我們在 before_request/after_request 中處理連線，這裡不需要 connect/close
         if User.select().where(User.username == username).exists():
             raise ValueError("Username already exists.")
+        from bcrypt import hashpw, gensalt
         hashed_password = hashpw(password.encode('utf-8'), gensalt()).decode('utf-8')
         return User.create(username=username, password_hash=hashed_password)
 
@@ -38,7 +42,11 @@ class Score(BaseModel):
         )
 
 def initialize_db(db):
-    """連接資料庫並創建表格 (如果不存在)"""
+    """連接資料庫並創建表格 (如果不存在)
+
+    不再於 import 時自動執行，請在部署或更新後明確執行一次：
+        flask --app app init-db
+    """
     db.connect()
     try:
         # 確保在嘗試創建表格時資料庫是可用的
@@ -49,26 +57,8 @@ def initialize_db(db):
         if not db.is_closed():
             db.close()
 
-# --- 2. 表單驗證 (WTForms) ---
-class RegistrationForm(Form):
-    username = StringField('使用者名稱', [validators.Length(min=4, max=25, message='長度必須介於 4 到 25 個字元')])
-    password = PasswordField('密碼', [
-        validators.DataRequired(message='密碼為必填項'),
-        validators.EqualTo('confirm', message='兩次密碼輸入不匹配')
-    ])
-    confirm = PasswordField('重複密碼')
-
-class LoginForm(Form):
-    username = StringField('使用者名稱', [validators.DataRequired(message='使用者名稱為必填項')])
-    password = PasswordField('密碼', [validators.DataRequired(message='密碼為必填項')])
-
-# --- 3. Flask 應用程式設定與路由 ---
-
-app = Flask(__name__)
-app.config['SECRET_KEY'] = SECRET_KEY
-
-# 在 app 實例化後立即執行初始化，確保資料表存在
-initialize_db(db)
+# --- 2. Flask 應用程式設定 ---
+# 表單類別定義於 forms.py，於路由中才載入 (見 register/login)
 
 def login_required(f):
     @wraps(f)
@@ -79,43 +69,108 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
-@app.before_request
 def before_request():
     """在每次請求前連接資料庫"""
     if db.is_closed():
         db.connect()
 
-@app.after_request
 def after_request(response):
     """在每次請求後關閉資料庫連接"""
     if not db.is_closed():
         db.close()
     return response
 
+# --- 3. 英雄榜快取 ---
+# 英雄榜對所有訪客都相同，只在能進入前 10 名的分數寫入時才需要重新渲染。
+# 以版本號標記英雄榜內容，快取的片段與匿名首頁在版本改變後的第一個請求重建。
+
+LEADERBOARD_SIZE = 10
+_leaderboard_lock = threading.Lock()
+_leaderboard_version = 0
+_leaderboard_cache = {}
+
+def bump_leaderboard_version():
+    """英雄榜內容改變，使快取失效"""
+    global _leaderboard_version
+    with _leaderboard_lock:
+        _leaderboard_version += 1
+
+def score_enters_leaderboard(score_value):
+    """判斷分數寫入後是否會出現在英雄榜中"""
+    lowest = (Score
+              .select(Score.score_value)
+              .order_by(Score.score_value.desc())
+              .offset(LEADERBOARD_SIZE - 1)
+              .limit(1)
+              .scalar())
+    return lowest is None or score_value >= lowest
+
+def get_leaderboard_cache():
+    """取得目前版本的英雄榜快取，版本過期時重新查詢並渲染"""
+    global _leaderboard_cache
+    version = _leaderboard_version
+    cache = _leaderboard_cache
+    if cache.get('version') == version:
+        return cache
+
+    # 使用 select 和 join 來高效地提取數據
+    top_scores = (Score
+                  .select(Score.score_value, User.username)
+                  .join(User)
+                  .order_by(Score.score_value.desc())
+                  .limit(LEADERBOARD_SIZE))
+    # leaderboard_data 為字典列表，包含 'username' 和 'score'
+    leaderboard_data = [{'username': s.user.username, 'score': s.score_value} for s in top_scores]
+
+    fragment = render_template('_leaderboard.html', leaderboard=leaderboard_data)
+    page = render_template('index.html', leaderboard_html=fragment, session={}).encode('utf-8')
+    page_gzip = gzip.compress(page, mtime=0)
+    cache = {
+        'version': version,
+        'fragment': fragment,
+        'page': page,
+        'page_gzip': page_gzip,
+        'etag': hashlib.sha1(page).hexdigest(),
+        'etag_gzip': hashlib.sha1(page_gzip).hexdigest(),
+    }
+    # 在查詢期間若版本又被更新，下一個請求會再重建一次
+    _leaderboard_cache = cache
+    return cache
+
 # --- 4. 路由定義 ---
 
-@app.route('/')
 def index():
     try:
-        # 使用 select 和 join 來高效地提取數據
-        top_scores = (Score
-                      .select(Score.score_value, User.username)
-                      .join(User)
-                      .order_by(Score.score_value.desc())
-                      .limit(10))
-        
-        # leaderboard_data 為字典列表，包含 'username' 和 'score'
-        leaderboard_data = [{'username': s.user.username, 'score': s.score_value} for s in top_scores]
+        cache = get_leaderboard_cache()
     except Exception as e:
         # 這會捕捉到 peewee.OperationalError: no such table，如果初始化失敗
         print(f"Leaderboard error (DB init issue?): {e}")
         flash('無法加載英雄榜數據。請確認資料庫已初始化。', 'danger')
-        leaderboard_data = []
+        leaderboard_html = render_template('_leaderboard.html', leaderboard=[])
+        return render_template('index.html', leaderboard_html=leaderboard_html, session=session)
+
+    if 'user_id' in session:
+        # 已登入：英雄榜沿用快取片段，只重新渲染登入區塊
+        return render_template('index.html', leaderboard_html=cache['fragment'], session=session)
+
+    # 匿名訪客：整頁由快取提供，支援 gzip 與 ETag/304
+    use_gzip = bool(request.accept_encodings['gzip'])
+    etag = cache['etag_gzip'] if use_gzip else cache['etag']
 
-    return render_template('index.html', leaderboard=leaderboard_data, session=session)
+    if request.if_none_match.contains(etag):
+        response = make_response('', 304)
+    elif use_gzip:
+        response = make_response(cache['page_gzip'])
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = make_response(cache['page'])
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.update(['Accept-Encoding', 'Cookie'])
+    return response
 
-@app.route('/register', methods=['GET', 'POST'])
 def register():
+    from forms import RegistrationForm
     form = RegistrationForm(request.form)
     if request.method == 'POST' and form.validate():
         try:
@@ -132,8 +187,8 @@ def register():
             
     return render_template('register.html', form=form)
 
-@app.route('/login', methods=['GET', 'POST'])
 def login():
+    from forms import LoginForm
     form = LoginForm(request.form)
     if request.method == 'POST' and form.validate():
         try:
@@ -142,6 +197,7 @@ def login():
             flash('無效的使用者名稱或密碼。', 'danger')
             return render_template('login.html', form=form)
 
+        from bcrypt import checkpw
         if checkpw(form.password.data.encode('utf-8'), user.password_hash.encode('utf-8')):
             session['username'] = user.username
             session['user_id'] = user.id
@@ -152,19 +208,16 @@ def login():
 
     return render_template('login.html', form=form)
 
-@app.route('/logout')
 def logout():
     session.pop('username', None)
     session.pop('user_id', None)
     flash('您已成功登出。', 'info')
     return redirect(url_for('index'))
 
-@app.route('/game')
 @login_required
 def game():
     return render_template('game.html')
 
-@app.route('/submit_score', methods=['POST'])
 @login_required
 def submit_score():
     """接收 Brython 傳來分數的 API """
@@ -183,12 +236,15 @@ def submit_score():
         if user_id is None:
             return jsonify({'success': False, 'message': 'Authentication failed or session expired (No user_id).'}), 401
         
+        qualifies = score_enters_leaderboard(score_value)
         # 直接傳入 user_id 作為外鍵值
         Score.create(
             user=user_id,
             score_value=score_value,
             timestamp=datetime.now()
         )
+        if qualifies:
+            bump_leaderboard_version()
         print(f"Success: Score {score_value} saved for user ID {user_id}.")
         return jsonify({'success': True, 'message': 'Score saved successfully!'})
         
@@ -197,5 +253,37 @@ def submit_score():
         # 如果發生 DB 錯誤，提示用戶重新登入
         return jsonify({'success': False, 'message': 'Database error occurred. Please log in again.'}), 401
 
+# --- 5. 應用程式工廠 ---
+
+def create_app():
+    """建立並設定 Flask 應用程式
+
+    不會連接資料庫或檢查資料表，資料表請以 `flask --app app init-db` 建立。
+    """
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = SECRET_KEY
+    # 將編譯後的 Jinja 模板快取於暫存目錄，重新啟動時不必重新編譯
+    app.jinja_options = dict(app.jinja_options, bytecode_cache=FileSystemBytecodeCache())
+
+    app.before_request(before_request)
+    app.after_request(after_request)
+
+    app.add_url_rule('/', 'index', index)
+    app.add_url_rule('/register', 'register', register, methods=['GET', 'POST'])
+    app.add_url_rule('/login', 'login', login, methods=['GET', 'POST'])
+    app.add_url_rule('/logout', 'logout', logout)
+    app.add_url_rule('/game', 'game', game)
+    app.add_url_rule('/submit_score', 'submit_score', submit_score, methods=['POST'])
+
+    @app.cli.command('init-db')
+    def init_db_command():
+        """建立資料表 (如果不存在)"""
+        initialize_db(db)
+        print('Database initialized.')
+
+    return app
+
+app = create_app()
+
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,33 @@
+# 量測 app.py 的啟動時間：import 時間與第一個請求的延遲
+# 用法: python bench_startup.py [次數]
+import subprocess
+import sys
+
+# 每次在新的 Python 行程中執行，才能量到冷啟動的成本
+CHILD = r"""
+import time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+client = app.app.test_client()
+response = client.get('/')
+t2 = time.perf_counter()
+print(f"{(t1 - t0) * 1000:.2f} {(t2 - t1) * 1000:.2f} {response.status_code}")
+"""
+
+def run_once():
+    output = subprocess.run([sys.executable, '-c', CHILD], capture_output=True, text=True, check=True).stdout
+    import_ms, first_request_ms, status = output.split()[-3:]
+    return float(import_ms), float(first_request_ms), int(status)
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    results = [run_once() for _ in range(runs)]
+    import_times = sorted(r[0] for r in results)
+    request_times = sorted(r[1] for r in results)
+    print(f"runs: {runs} (status of GET /: {results[-1][2]})")
+    print(f"import app      : min {import_times[0]:.2f} ms, median {import_times[runs // 2]:.2f} ms")
+    print(f"first request / : min {request_times[0]:.2f} ms, median {request_times[runs // 2]:.2f} ms")
+
+if __name__ == '__main__':
+    main()
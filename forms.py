@@ -0,0 +1,14 @@
+# 表單驗證 (WTForms)，由 app.py 的路由在需要時才載入
+from wtforms import Form, StringField, PasswordField, validators
+
+class RegistrationForm(Form):
+    username = StringField('使用者名稱', [validators.Length(min=4, max=25, message='長度必須介於 4 到 25 個字元')])
+    password = PasswordField('密碼', [
+        validators.DataRequired(message='密碼為必填項'),
+        validators.EqualTo('confirm', message='兩次密碼輸入不匹配')
+    ])
+    confirm = PasswordField('重複密碼')
+
+class LoginForm(Form):
+    username = StringField('使用者名稱', [validators.DataRequired(message='使用者名稱為必填項')])
+    password = PasswordField('密碼', [validators.DataRequired(message='密碼為必填項')])